@@ -1,4 +1,9 @@
-from aprendizagem_reforco import MemoriaEsparsa, EGreedy, QLearning, MecAprendRef
+import sys
+from functools import partial
+import numpy as np
+from aprendizagem_reforco import MemoriaDensa, EGreedy, QLearning, MecAprendRef, GeradorAleatorio
+from aplicacao_do_problema.nucleo import (MOVIMENTOS, construir_transicoes, executar_epoca, executar_epoca_sequencial,
+                                         executar_epoca_vetorizada, semear)
 from colorama import Fore, Style
 
 class Labirinto:
@@ -6,83 +11,109 @@ class Labirinto:
     Classe que representa o labirinto
     """
 
-    MOVIMENTOS = {
-        'cima': (-1, 0),
-        'baixo': (1, 0),
-        'esquerda': (0, -1),
-        'direita': (0, 1),
-    }
+    MOVIMENTOS = MOVIMENTOS
 
     def __init__(self, matriz):
         """
         Inicialização do labirinto com a matriz fornecida
+
+        Os estados são inteiros (linha * largura + coluna) e as ações são os índices dos MOVIMENTOS,
+        para que as memórias de aprendizagem usem chaves simples em vez de tuplos e strings.
         """
         self.matriz = matriz
+        self.celulas = np.array(matriz, dtype=object)  # Matriz como array NumPy, para procurar símbolos sem ciclos
+        self.largura = len(matriz[0])
         self.pos_inicial = self.encontrar_posicao('E')
         self.pos_final = self.encontrar_posicao('S')
-        self.estado_atual = self.pos_inicial
+        self.estado_inicial = self.estado(self.pos_inicial)
+        self.estado_final = self.estado(self.pos_final)
+        self.estado_atual = self.estado_inicial
+        self.acao_idx = {nome: k for k, nome in enumerate(self.MOVIMENTOS)}  # Nome da ação -> índice
+        # Grelha int8 (1 = parede, 0 = caminho livre); as paredes podem vir como 1 ou '1'
+        self.grelha = np.where((self.celulas == 1) | (self.celulas == '1'), 1, 0).astype(np.int8)
+
+        # Tabelas (estados x ações) com o próximo estado e a recompensa de cada movimento, usadas no treino compilado
+        self.proximo_estado, self.recompensa = construir_transicoes(self.grelha, self.estado_final)
+        # As mesmas tabelas como listas de pares (próximo estado, recompensa), mais rápidas de consultar em Python
+        self.transicoes = [list(zip(estados, recompensas))
+                           for estados, recompensas in zip(self.proximo_estado.tolist(), self.recompensa.tolist())]
 
     def encontrar_posicao(self, simbolo):
         """
         Metodo que encontra a posição de um símbolo específico na matriz
         """
-        for i, linha in enumerate(self.matriz):
-            for j, celula in enumerate(linha):
-                if celula == simbolo:
-                    return (i, j)
+        i, j = np.argwhere(self.celulas == simbolo)[0]
+        return (int(i), int(j))
+
+    def estado(self, posicao):
+        """
+        Metodo que converte uma posição (linha, coluna) no estado inteiro correspondente
+        """
+        return posicao[0] * self.largura + posicao[1]
+
+    def posicao(self, estado):
+        """
+        Metodo que converte um estado inteiro na posição (linha, coluna) correspondente
+        """
+        return divmod(estado, self.largura)
 
     def reset(self):
         """
         Metodo que faz reset no estado atual para a posição inicial
         """
-        self.estado_atual = self.pos_inicial
+        self.estado_atual = self.estado_inicial
         return self.estado_atual
 
     def realizar_acao(self, acao):
         """
-        Metodo que realiza uma ação no labirinto e retorna o novo estado e a recompensa (Utiliza as constantes MOVIMENTO defenidas no inicio da classe)
+        Metodo que realiza uma ação (índice dos MOVIMENTOS) no labirinto e retorna o novo estado e a recompensa
+
+        O resultado de cada movimento (incluindo bater numa parede, com recompensa -10) já está calculado em 'transicoes'.
         """
-        movimento = self.MOVIMENTOS.get(acao)
+        self.estado_atual, recompensa = self.transicoes[self.estado_atual][acao]
+        return self.estado_atual, recompensa
+
 
-        nova_posicao = (
-            self.estado_atual[0] + movimento[0],
-            self.estado_atual[1] + movimento[1],
-        )
+# Células já coloridas, calculadas uma única vez (os códigos de cor não mudam entre desenhos)
+CELULAS = {
+    1: Fore.WHITE + ' # ' + Style.RESET_ALL,  # Paredes (branco)
+    'E': Fore.GREEN + ' E ' + Style.RESET_ALL,  # Entrada (verde)
+    'S': Fore.BLUE + ' S ' + Style.RESET_ALL,  # Saída (azul)
+    0: ' . ',  # Caminhos livres
+    'A': Fore.RED + ' A ' + Style.RESET_ALL,  # Agente (vermelho)
+    '*': Fore.YELLOW + ' * ' + Style.RESET_ALL,  # Caminho percorrido (amarelo)
+    'O': Fore.CYAN + ' O ' + Style.RESET_ALL,  # Caminho ótimo (ciano)
+}
+CELULAS['1'] = CELULAS[1]  # As paredes também podem vir como '1', tal como na grelha do Labirinto
 
-        # Verifica se o movimento é válido
-        if (0 <= nova_posicao[0] < len(self.matriz) and
-            0 <= nova_posicao[1] < len(self.matriz[0]) and
-            self.matriz[nova_posicao[0]][nova_posicao[1]] != 1):
-            self.estado_atual = nova_posicao
-            if self.estado_atual == self.pos_final:
-                return self.estado_atual, 1  # Recompensa ao chegar na saída
-            return self.estado_atual, -1  # Recompensa por movimento
-        return self.estado_atual, -10  # Recompensa negativa se bater na parede
 
+def criar_moldura(matriz):
+    """
+    Metodo que cria a moldura base do labirinto (paredes, entrada, saída e caminhos livres já coloridos)
 
-def desenhar_labirinto(matriz, pos_agente, caminho_percorrido, caminho_otimo=None):
+    Estas células nunca mudam, por isso são calculadas uma única vez e reutilizadas em cada desenho.
+    """
+    return [[CELULAS.get(celula, CELULAS[0]) for celula in linha] for linha in matriz]
+
+
+def desenhar_labirinto(moldura, pos_agente, caminho_percorrido, caminho_otimo=None):
     """
     Metodo que desenha o labirinto
+
+    Parte de uma cópia da moldura base e só altera as células do caminho percorrido, do caminho ótimo e do agente.
+    O desenho completo é escrito no terminal de uma só vez.
     """
-    for i, linha in enumerate(matriz):
-        linha_str = ''
-        for j, celula in enumerate(linha):
-            if (i, j) == pos_agente:
-                linha_str += Fore.RED + ' A ' + Style.RESET_ALL  # Agente (vermelho)
-            elif caminho_otimo and (i, j) in caminho_otimo:
-                linha_str += Fore.CYAN + ' O ' + Style.RESET_ALL  # Caminho ótimo (ciano)
-            elif (i, j) in caminho_percorrido:
-                linha_str += Fore.YELLOW + ' * ' + Style.RESET_ALL  # Caminho percorrido (amarelo)
-            elif celula == 1:
-                linha_str += Fore.WHITE + ' # ' + Style.RESET_ALL  # Paredes (branco)
-            elif celula == 'E':
-                linha_str += Fore.GREEN + ' E ' + Style.RESET_ALL  # Entrada (verde)
-            elif celula == 'S':
-                linha_str += Fore.BLUE + ' S ' + Style.RESET_ALL  # Saída (azul)
-            else:
-                linha_str += ' . '  # Caminhos livres
-        print(linha_str)
-    print('\n')
+    linhas = [linha[:] for linha in moldura]
+    celula = CELULAS['*']
+    for i, j in caminho_percorrido:
+        linhas[i][j] = celula
+    celula = CELULAS['O']
+    for i, j in caminho_otimo or ():
+        linhas[i][j] = celula
+    if pos_agente is not None:
+        linhas[pos_agente[0]][pos_agente[1]] = CELULAS['A']
+
+    sys.stdout.write('\n'.join([''.join(linha) for linha in linhas]) + '\n\n\n')
 
 
 # Configuração do labirinto
@@ -98,57 +129,95 @@ labirinto = Labirinto([
     [1, 0, 1, 1, 1, 1, 0, 1, 'S', 1],
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
 ])
+moldura = criar_moldura(labirinto.matriz)
 
 
 # Configuração da aprendizagem por reforço
-memoria = MemoriaEsparsa()
-acoes = list(Labirinto.MOVIMENTOS.keys())
-estrategia = EGreedy(memoria, acoes, epsilon=0.1)
-qlearning = QLearning(memoria, estrategia, alfa=0.1, gama=0.9)
-agente = MecAprendRef(qlearning, acoes)
+alfa = np.float32(0.1)
+gama = np.float32(0.9)
+epsilon = np.float32(0.1)
+# Com uma semente o treino é reprodutível em todos os modos (os episódios compilados passam a ser
+# executados numa só thread, pelo executar_epoca_sequencial)
+semente = None
+acoes = list(labirinto.acao_idx.values())
+memoria = MemoriaDensa(labirinto.grelha.size, len(acoes))
+estrategia = EGreedy(memoria, acoes, epsilon=epsilon, gerador=GeradorAleatorio(semente))
 
 
-# Treino
-num_episodios = 200
-
-for episodio in range(num_episodios):
-    estado_atual = labirinto.reset()
-    custo_total = 0
-    caminho_percorrido = []
+# Visualização (por omissão o labirinto é desenhado apenas no fim de um em cada 'desenhar_a_cada' episódios;
+# com 'desenhar_passos' o treino é feito passo a passo pela biblioteca e cada movimento é desenhado)
+desenhar_a_cada = 50
+desenhar_passos = False
 
-    print(f"\nEpisódio {episodio + 1}")
-    desenhar_labirinto(labirinto.matriz, estado_atual, caminho_percorrido)
 
-    while estado_atual != labirinto.pos_final:
-        acao = agente.selecionar_acao(estado_atual)
-        novo_estado, recompensa = labirinto.realizar_acao(acao)
-        agente.aprender(estado_atual, acao, recompensa, novo_estado)
-
-        # Atualiza o estado, custo e caminho percorrido
-        estado_atual = novo_estado
-        if estado_atual not in caminho_percorrido:  # Evita duplicações
-            caminho_percorrido.append(estado_atual)
-        custo_total += recompensa
-
-        # Atualiza o desenho do labirinto
-        desenhar_labirinto(labirinto.matriz, estado_atual, caminho_percorrido)
-
-    print(f"Episódio {episodio + 1}: Custo total = {custo_total}")
+# Treino
+num_episodios = 200
+episodios_paralelos = 8
+treino_vetorizado = False  # Se True, os episódios de cada época avançam em lote com NumPy, em vez de em threads do Numba
+
+if desenhar_passos:
+    qlearning = QLearning(memoria, estrategia, alfa=alfa, gama=gama)
+    agente = MecAprendRef(qlearning, acoes)
+
+    for episodio in range(num_episodios):
+        estado_atual = labirinto.reset()
+        custo_total = 0
+        caminho_percorrido = set()  # Conjunto: evita duplicações em O(1) e a ordem não interessa ao desenho
+
+        print(f"\nEpisódio {episodio + 1}")
+        desenhar_labirinto(moldura, labirinto.posicao(estado_atual), caminho_percorrido)
+
+        while estado_atual != labirinto.estado_final:
+            acao = agente.selecionar_acao(estado_atual)
+            novo_estado, recompensa = labirinto.realizar_acao(acao)
+            agente.aprender(estado_atual, acao, recompensa, novo_estado)
+
+            # Atualiza o estado, custo e caminho percorrido
+            estado_atual = novo_estado
+            caminho_percorrido.add(labirinto.posicao(estado_atual))
+            custo_total += recompensa
+
+            # Atualiza o desenho do labirinto
+            desenhar_labirinto(moldura, labirinto.posicao(estado_atual), caminho_percorrido)
+
+        print(f"Episódio {episodio + 1}: Custo total = {custo_total}")
+else:
+    # Os episódios são executados em paralelo, em épocas de 'episodios_paralelos' episódios, pelo
+    # código compilado com o Numba (ou vetorizado com NumPy), que atualiza diretamente a tabela Q da memória densa
+    if treino_vetorizado:
+        executar = partial(executar_epoca_vetorizada, rng=np.random.default_rng(semente))
+    elif semente is not None:
+        semear(semente)
+        executar = executar_epoca_sequencial
+    else:
+        executar = executar_epoca
+
+    for inicio_epoca in range(0, num_episodios, episodios_paralelos):
+        n_episodios = min(episodios_paralelos, num_episodios - inicio_epoca)
+        custos, visitados = executar(labirinto.proximo_estado, labirinto.recompensa, memoria.Q_table,
+                                     labirinto.estado_inicial, labirinto.estado_final, alfa, gama, epsilon,
+                                     n_episodios)
+        for episodio, custo_total in enumerate(custos, start=inicio_epoca):
+            if episodio % desenhar_a_cada == 0:
+                caminho_percorrido = [labirinto.posicao(s) for s in visitados[episodio - inicio_epoca].nonzero()[0]]
+                print(f"\nEpisódio {episodio + 1}")
+                desenhar_labirinto(moldura, labirinto.pos_final, caminho_percorrido)
+            print(f"Episódio {episodio + 1}: Custo total = {custo_total}")
 
 
 # Caminho ótimo obtido
 print("\n=== Caminho Ótimo ===")
 estado_atual = labirinto.reset()
-caminho_otimo = [estado_atual]
+caminho_otimo = [labirinto.posicao(estado_atual)]
 custo_total = 0
 
-while estado_atual != labirinto.pos_final:
+while estado_atual != labirinto.estado_final:
     acao = estrategia.aproveitar(estado_atual)
     estado_atual, recompensa = labirinto.realizar_acao(acao)
-    caminho_otimo.append(estado_atual)
+    caminho_otimo.append(labirinto.posicao(estado_atual))
     custo_total += recompensa
 
 # Desenha o labirinto com o caminho ótimo
-desenhar_labirinto(labirinto.matriz, None, [], caminho_otimo)
+desenhar_labirinto(moldura, None, [], caminho_otimo)
 print(f"Caminho ótimo: {caminho_otimo}")
-print(f"Custo total: {custo_total}")
+print(f"Custo total: {custo_total}")
\ No newline at end of file
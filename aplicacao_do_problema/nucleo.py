@@ -0,0 +1,204 @@
+import numpy as np
+from numba import njit, prange, boolean, float32, int32, int64, types
+
+# Movimentos possíveis no labirinto, pela ordem que define o índice de cada ação
+MOVIMENTOS = {
+    'cima': (-1, 0),
+    'baixo': (1, 0),
+    'esquerda': (0, -1),
+    'direita': (0, 1),
+}
+
+DELTAS = np.array(list(MOVIMENTOS.values()), dtype=np.int8)  # Índice da ação -> (delta linha, delta coluna)
+
+# Tipos dos argumentos dos ciclos de treino: a tabela Q e os parâmetros (alfa, gama, epsilon) são float32,
+# para que as contas não passem a float64 e cada linha da tabela ocupe metade da memória.
+TABELA_INT = int32[:, ::1]
+TABELA_Q = float32[:, ::1]
+ASSINATURA_EPISODIO = int64(TABELA_INT, TABELA_INT, TABELA_Q, int64, int64, float32, float32, float32, boolean[::1])
+ASSINATURA_EPOCA = types.Tuple((int64[::1], boolean[:, ::1]))(
+    TABELA_INT, TABELA_INT, TABELA_Q, int64, int64, float32, float32, float32, int64)
+
+
+@njit(cache=True)
+def passo(grelha, s, acao, fim):
+    """
+    Metodo que realiza uma ação na grelha do labirinto e retorna o novo estado e a recompensa
+
+    Define as regras de movimento do labirinto sobre a grelha int8 (1 = parede, 0 = livre), com os estados
+    codificados como inteiros (linha * largura + coluna). É usado pelo construir_transicoes.
+    """
+    largura = grelha.shape[1]
+    nr = s // largura + DELTAS[acao, 0]
+    nc = s % largura + DELTAS[acao, 1]
+
+    # Verifica se o movimento é válido
+    if 0 <= nr < grelha.shape[0] and 0 <= nc < largura and grelha[nr, nc] != 1:
+        sn = nr * largura + nc
+        if sn == fim:
+            return sn, 1  # Recompensa ao chegar na saída
+        return sn, -1  # Recompensa por movimento
+    return s, -10  # Recompensa negativa se bater na parede
+
+
+@njit(cache=True)
+def construir_transicoes(grelha, fim):
+    """
+    Metodo que calcula, uma única vez, o próximo estado e a recompensa de cada par (estado, ação)
+
+    Como o labirinto é fixo, o resultado de cada ação só depende do estado e da ação, por isso em vez de
+    verificar os limites e as paredes em cada passo basta consultar estas tabelas (estados x ações).
+    """
+    n_estados = grelha.size
+    n_acoes = DELTAS.shape[0]
+    proximo_estado = np.empty((n_estados, n_acoes), dtype=np.int32)
+    recompensa = np.empty((n_estados, n_acoes), dtype=np.int32)
+    for s in range(n_estados):
+        for a in range(n_acoes):
+            proximo_estado[s, a], recompensa[s, a] = passo(grelha, s, a, fim)
+    return proximo_estado, recompensa
+
+
+@njit(cache=True)
+def e_greedy(Q, s, epsilon):
+    """
+    Metodo que seleciona uma ação com a estratégia epsilon-greedy sobre a tabela Q
+
+    Em caso de empate entre as melhores ações é escolhida uma delas aleatoriamente, como no SelAcao.max_acao.
+    """
+    if np.random.rand() <= epsilon:
+        return np.random.randint(Q.shape[1])  # Exploração (escolhe uma ação aleatória)
+
+    linha = Q[s]
+    melhor = linha.max()
+    n_melhores = 0
+    acao = 0
+    for a in range(linha.shape[0]):
+        if linha[a] == melhor:
+            n_melhores += 1
+            if np.random.randint(n_melhores) == 0:  # Escolha uniforme entre os empates, numa só passagem
+                acao = a
+    return acao
+
+
+@njit(ASSINATURA_EPISODIO, cache=True)
+def executar_episodio(proximo_estado, recompensa, Q, inicio, fim, alfa, gama, epsilon, visitados):
+    """
+    Metodo que executa um episódio completo de Q-Learning, da entrada até à saída
+
+    Os movimentos são consultados nas tabelas calculadas pelo construir_transicoes.
+    A tabela Q (estados x ações) é atualizada no próprio array e os estados por onde o agente
+    passou são marcados em 'visitados', para desenhar o caminho percorrido.
+    Retorna o custo total do episódio.
+    """
+    s = inicio
+    custo_total = 0
+    visitados[:] = False
+    while s != fim:
+        a = e_greedy(Q, s, epsilon)
+        sn = proximo_estado[s, a]
+        r = recompensa[s, a]
+
+        # Atualiza o valor Q com a fórmula do Q-Learning (melhor valor Q no próximo estado)
+        Q[s, a] += alfa * (np.float32(r) + gama * Q[sn].max() - Q[s, a])
+
+        s = sn
+        visitados[s] = True
+        custo_total += r
+    return custo_total
+
+
+@njit(ASSINATURA_EPOCA, cache=True, parallel=True)
+def executar_epoca(proximo_estado, recompensa, Q, inicio, fim, alfa, gama, epsilon, n_episodios):
+    """
+    Metodo que executa vários episódios em paralelo (um por núcleo do CPU) sobre a mesma tabela Q
+
+    Todos os episódios leem e atualizam diretamente a tabela partilhada, sem bloqueios (ao estilo Hogwild):
+    cada episódio aproveita logo o que os outros aprendem e, no pior caso, uma atualização simultânea
+    do mesmo par (s, a) perde-se, o que o Q-Learning tolera. Retorna o custo total e os estados
+    visitados de cada episódio.
+    """
+    custos = np.empty(n_episodios, dtype=np.int64)
+    visitados = np.empty((n_episodios, Q.shape[0]), dtype=np.bool_)
+
+    for m in prange(n_episodios):
+        custos[m] = executar_episodio(proximo_estado, recompensa, Q, inicio, fim,
+                                      alfa, gama, epsilon, visitados[m])
+    return custos, visitados
+
+
+@njit(ASSINATURA_EPOCA, cache=True)
+def executar_epoca_sequencial(proximo_estado, recompensa, Q, inicio, fim, alfa, gama, epsilon, n_episodios):
+    """
+    Metodo que executa vários episódios um a seguir ao outro, numa só thread, sobre a mesma tabela Q
+
+    Faz o mesmo que o executar_epoca, mas sem threads não há atualizações perdidas nem resultados dependentes
+    da ordem em que as threads escrevem na tabela Q. Com o gerador do Numba semeado (ver semear), o treino
+    é reprodutível.
+    """
+    custos = np.empty(n_episodios, dtype=np.int64)
+    visitados = np.empty((n_episodios, Q.shape[0]), dtype=np.bool_)
+
+    for m in range(n_episodios):
+        custos[m] = executar_episodio(proximo_estado, recompensa, Q, inicio, fim,
+                                      alfa, gama, epsilon, visitados[m])
+    return custos, visitados
+
+
+@njit(cache=True)
+def semear(semente):
+    """
+    Metodo que fixa a semente do gerador de números aleatórios usado pelo código compilado
+
+    O Numba tem um gerador próprio, separado do np.random do Python, por isso a semente tem de ser fixada
+    dentro de uma função compilada. Só torna reprodutível o executar_epoca_sequencial: no executar_epoca
+    cada thread tem o seu gerador e a ordem das escritas na tabela Q varia entre execuções.
+    """
+    np.random.seed(semente)
+
+
+def executar_epoca_vetorizada(proximo_estado, recompensa, Q, inicio, fim, alfa, gama, epsilon, n_episodios, rng=None):
+    """
+    Metodo que executa vários episódios em simultâneo, com um agente por episódio a avançar em lote
+
+    Alternativa ao executar_epoca só com NumPy: em cada passo todos os agentes que ainda não chegaram à
+    saída escolhem a ação (epsilon-greedy), avançam e atualizam a tabela Q partilhada com meia dúzia de
+    operações sobre arrays, em vez de um ciclo Python por agente. Retorna o custo total e os estados
+    visitados de cada episódio, como o executar_epoca. Os números aleatórios vêm do gerador NumPy 'rng'
+    (um novo gerador sem semente, se não for indicado).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    alfa, gama = np.float32(alfa), np.float32(gama)  # Mantém as contas em float32, como a tabela Q
+    n_acoes = Q.shape[1]
+    estados = np.full(n_episodios, inicio, dtype=np.int32)
+    custos = np.zeros(n_episodios, dtype=np.int64)
+    visitados = np.zeros((n_episodios, Q.shape[0]), dtype=np.bool_)
+    ativos = np.arange(n_episodios)  # Agentes que ainda não chegaram à saída
+
+    while ativos.size > 0:
+        s = estados[ativos]
+
+        # Aproveitamento: melhor ação de cada agente, com desempate aleatório entre as melhores
+        linhas = Q[s]
+        melhores = linhas == linhas.max(axis=1, keepdims=True)
+        a = (melhores * rng.random(linhas.shape)).argmax(axis=1)
+
+        # Exploração: os agentes sorteados escolhem uma ação aleatória
+        explorar = rng.random(ativos.size) <= epsilon
+        a[explorar] = rng.integers(n_acoes, size=explorar.sum())
+
+        sn = proximo_estado[s, a]
+        r = recompensa[s, a]
+
+        # Atualiza os valores Q com a fórmula do Q-Learning (o add.at acumula os pares (s, a) repetidos)
+        td = gama * Q[sn].max(axis=1)
+        td += r  # Soma no próprio array float32 (r + td criaria um array float64)
+        td -= Q[s, a]
+        np.add.at(Q, (s, a), alfa * td)
+
+        estados[ativos] = sn
+        custos[ativos] += r
+        visitados[ativos, sn] = True
+        ativos = ativos[sn != fim]
+
+    return custos, visitados
@@ -1 +1 @@
-from aprendizagem_reforco.aprendizagem_reforco import MecAprendRef, EGreedy, SARSA, DynaQ, QLearning, QME, MemoriaEsparsa, AprendRef, MemoriaAprend, MemoriaExperiencia, ModeloTR
\ No newline at end of file
+from aprendizagem_reforco.aprendizagem_reforco import MecAprendRef, EGreedy, SARSA, DynaQ, QLearning, QME, MemoriaEsparsa, MemoriaDensa, AprendRef, MemoriaAprend, MemoriaExperiencia, MemoriaExperienciaPrioritaria, ModeloTR, GeradorAleatorio
\ No newline at end of file
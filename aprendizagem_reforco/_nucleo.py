@@ -0,0 +1,69 @@
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def atualizar_lote_q_learning(Q, s, a, r, sn, alfa, gama):
+    """
+    Atualiza a tabela Q (estados x ações) com um lote de transições, usando a fórmula do Q-Learning
+
+    As transições são aplicadas uma a uma e pela ordem do lote, como se o aprender fosse chamado
+    para cada uma, por isso um par (s, a) repetido no lote vê o valor já atualizado.
+    Retorna o erro de diferença temporal de cada transição.
+    """
+    td = np.empty(s.shape[0], dtype=np.float32)
+    for i in range(s.shape[0]):
+        qsa = Q[s[i], a[i]]
+        td[i] = r[i] + gama * Q[sn[i]].max() - qsa
+        Q[s[i], a[i]] = qsa + alfa * td[i]
+    return td
+
+
+@njit(cache=True, fastmath=True)
+def atualizar_lote_sarsa(Q, s, a, r, sn, an, alfa, gama):
+    """
+    Atualiza a tabela Q (estados x ações) com um lote de transições, usando a fórmula do SARSA
+
+    Igual ao atualizar_lote_q_learning, mas com o valor da próxima ação escolhida (an) em vez do melhor valor.
+    """
+    for i in range(s.shape[0]):
+        qsa = Q[s[i], a[i]]
+        Q[s[i], a[i]] = qsa + alfa * (r[i] + gama * Q[sn[i], an[i]] - qsa)
+
+
+@njit(cache=True)
+def descer_arvore_somas(arvore, u):
+    """
+    Desce a árvore de somas (por níveis, raiz na posição 1) com cada valor de 'u' e retorna as folhas alcançadas
+
+    Em cada nó o valor segue para a esquerda se for menor que a soma do filho esquerdo,
+    senão segue para a direita, descontando essa soma. Nunca segue para um filho com soma nula, para que
+    um valor igual ao total (por arredondamento) não chegue a uma folha vazia ou com prioridade zero.
+    """
+    folhas = arvore.shape[0] // 2
+    no = np.empty(u.shape[0], dtype=np.int64)
+    for i in range(u.shape[0]):
+        valor = u[i]
+        k = 1
+        while k < folhas:
+            k *= 2
+            if valor >= arvore[k] and arvore[k + 1] > 0:
+                valor -= arvore[k]
+                k += 1
+        no[i] = k - folhas
+    return no
+
+
+@njit(cache=True)
+def atualizar_arvore_somas(arvore, idx, prioridades):
+    """
+    Altera as folhas 'idx' da árvore de somas para as 'prioridades' e recalcula os nós acima de cada uma
+    """
+    folhas = arvore.shape[0] // 2
+    for i in range(idx.shape[0]):
+        k = idx[i] + folhas
+        arvore[k] = prioridades[i]
+        k //= 2
+        while k >= 1:
+            arvore[k] = arvore[2 * k] + arvore[2 * k + 1]
+            k //= 2
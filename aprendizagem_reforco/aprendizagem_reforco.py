@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod
-from random import random, shuffle, choice, sample
+from collections import defaultdict
+
+import numpy as np
+
+from aprendizagem_reforco._nucleo import (atualizar_lote_q_learning, atualizar_lote_sarsa,
+                                          descer_arvore_somas, atualizar_arvore_somas)
 
 
 class MecAprendRef:
     """
     Classe principal que vai coordenar a aprendizagem por reforço
     """
+
+    __slots__ = ('aprend_ref', 'acoes', 'aprender', 'selecionar_acao')
+
     def __init__(self, aprend_ref, acoes):
         """
         Inicialização do mecanismo de aprendizagem por reforço
@@ -14,30 +22,16 @@ class MecAprendRef:
         self.aprend_ref = aprend_ref
         self.acoes = acoes
 
-    def aprender(self, s, a, r, sn, an=None):
-        """
-        Executa a aprendizagem no ambiente
-
-        Encaminha os parametros de aprendizagem para o algoritmo de aprendizagem associado,
-        Se usarmos o algoritmo SARSA, ele vai precisar da variavel 'an' que é a próxima ação
-        no próximo estado, se não usarmos o SARSA passamos apenas os parametros padrão
+        # Os metodos de aprendizagem e de seleção de ação são resolvidos uma única vez e guardados
+        # diretamente no objeto, em vez de repetir os acessos em cada passo.
+        #
+        # aprender(s, a, r, sn, an=None): executa a aprendizagem com o algoritmo associado.
+        # Todos os algoritmos aceitam a variavel 'an' (a próxima ação no próximo estado), que só
+        # é usada pelo SARSA; os restantes ignoram-na.
+        self.aprender = aprend_ref.aprender
 
-        Caso esta validação seja removida o algoritmo Q-Learning não vai funcionar como esperado,
-        porque ao passar o valor 'an' (mesmo sendo None) vai causar calculos errados.
-        """
-
-        # Verifica se o algoritmo é o SARSA
-        if isinstance(self.aprend_ref, SARSA):
-            self.aprend_ref.aprender(s, a, r, sn, an)
-        else:
-            self.aprend_ref.aprender(s, a, r, sn)
-
-    def selecionar_acao(self, s):
-        """
-        Metodo que seleciona a melhor ação para um determinado estado.
-        """
-
-        return self.aprend_ref.sel_accao.selecionar_acao(s)
+        # selecionar_acao(s): seleciona a melhor ação para um determinado estado.
+        self.selecionar_acao = aprend_ref.sel_accao.selecionar_acao
 
 
 class MemoriaAprend(ABC):
@@ -48,6 +42,8 @@ class MemoriaAprend(ABC):
     durante o processo de aprendizagem por reforço.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def atualizar(self, s, a, q):
         """
@@ -70,6 +66,58 @@ class MemoriaAprend(ABC):
 
         pass
 
+    def Q_acoes(self, s, acoes):
+        """
+        Retorna os valores Q de todas as ações para um estado, pela ordem de 'acoes'.
+
+        As subclasses podem redefinir este metodo quando conseguem obter
+        os valores de todas as ações de uma só vez.
+        """
+
+        return [self.Q(s, a) for a in acoes]
+
+
+class GeradorAleatorio:
+    """
+    Gerador dos números aleatórios usados na aprendizagem
+
+    Os números uniformes em [0, 1) são sorteados em blocos, numa só chamada ao NumPy, e consumidos
+    um a um com next(gerador.uniformes, None), o que é mais rápido do que chamar random() a cada
+    passo. Quando o bloco se esgota (next retorna None) é sorteado outro com o novo_bloco.
+    O mesmo gerador pode ser partilhado pela estratégia de seleção, pelo modelo e pela memória de
+    experiência, e com uma 'semente' a aprendizagem feita por estas classes passa a ser reprodutível.
+    O código compilado da aplicação do labirinto tem o seu próprio gerador (ver nucleo.semear).
+    """
+
+    __slots__ = ('rng', 'dim_bloco', 'uniformes')
+
+    def __init__(self, semente=None, dim_bloco=8192):
+        """
+        Inicialização do gerador
+        """
+
+        self.rng = np.random.default_rng(semente)  # Gerador do NumPy, também usado para sortear lotes
+        self.dim_bloco = dim_bloco
+        self.uniformes = iter(())  # Bloco de números uniformes em [0, 1) ainda por usar
+
+    def novo_bloco(self):
+        """
+        Sorteia um novo bloco de números uniformes em [0, 1) e retorna o primeiro.
+        """
+
+        self.uniformes = iter(self.rng.random(self.dim_bloco).tolist())
+        return next(self.uniformes)
+
+    def uniforme(self):
+        """
+        Retorna o próximo número uniforme em [0, 1) do bloco.
+        """
+
+        u = next(self.uniformes, None)
+        if u is None:
+            u = self.novo_bloco()
+        return u
+
 
 class SelAcao(ABC):
     """
@@ -79,12 +127,20 @@ class SelAcao(ABC):
     nos valores Q guardados.
     """
 
-    def __init__(self, mem_aprend):
+    __slots__ = ('mem_aprend', 'gerador', 'melhor_acao_cache', 'maximos')
+
+    def __init__(self, mem_aprend, gerador=None):
         """
         Inicializa a estratégia de seleção de ações.
+
+        Se não for indicado um GeradorAleatorio é criado um novo.
         """
 
         self.mem_aprend = mem_aprend
+        self.gerador = gerador if gerador is not None else GeradorAleatorio()
+        self.melhor_acao_cache = None  # (estado, melhor ação) calculado pelo Q-Learning no último passo
+        # Melhores ações únicas já calculadas, quando a memória as guarda (ver MemoriaEsparsa.maximos)
+        self.maximos = getattr(mem_aprend, 'maximos', None)
 
     @abstractmethod
     def selecionar_acao(self, s):
@@ -102,12 +158,47 @@ class SelAcao(ABC):
         Retorna a ação com o maior valor Q para um estado dado.
 
         Este metodo escolhe a ação que maximiza o valor Q no estado atual.
-        Caso duas ações tenham o mesmo valor Q, as ações são baralhadas para garantir uma escolha
-        aleatória entre as melhores.
+        Caso duas ações tenham o mesmo valor Q, é escolhida aleatoriamente uma das melhores
+        (sem baralhar a lista 'acoes', que pertence a quem chama o metodo). Quando a melhor
+        ação é única não é gerado nenhum número aleatório.
         """
 
-        shuffle(acoes)
-        return max(acoes, key=lambda a: self.mem_aprend.Q(s, a))
+        return self.max_acao_q(s, acoes)[0]
+
+    def max_acao_q(self, s, acoes):
+        """
+        Retorna a ação com o maior valor Q para um estado dado e esse valor.
+
+        Faz o mesmo que o max_acao, mas retorna também o valor máximo, para quem precisa dos dois
+        (ex. o Q-Learning) não ter de voltar a consultar a memória.
+
+        Se a memória guardar os máximos dos estados (MemoriaEsparsa) e 'acoes' for o tuplo de ações
+        da memória, uma melhor ação única já calculada é reutilizada até o estado voltar a ser atualizado.
+        """
+
+        maximos = self.maximos
+        if maximos is not None:
+            if acoes is self.mem_aprend.acoes:
+                melhor = maximos.get(s)
+                if melhor is not None:
+                    return melhor
+            else:
+                maximos = None  # Os máximos guardados são só para as ações da memória
+
+        valores = np.asarray(self.mem_aprend.Q_acoes(s, acoes))
+        maximo = valores.max()
+        melhores = np.flatnonzero(valores == maximo)  # Índices das ações com o valor Q máximo
+        if len(melhores) == 1:
+            # Caso mais comum (melhor ação única), não é preciso sortear
+            melhor = acoes[melhores[0]], maximo
+            if maximos is not None:
+                maximos[s] = melhor
+            return melhor
+        gerador = self.gerador
+        u = next(gerador.uniformes, None)
+        if u is None:
+            u = gerador.novo_bloco()
+        return acoes[melhores[int(u * len(melhores))]], maximo
 
 
 class AprendRef(ABC):
@@ -119,6 +210,8 @@ class AprendRef(ABC):
     e um metodo abstrato que vai ser implementado pelas subclasses.
     """
 
+    __slots__ = ('mem_aprend', 'sel_accao', 'alfa', 'gama', '_Q', '_atualizar')
+
     def __init__(self, mem_aprend, sel_accao, alfa, gama):
         """
         Inicializa os parametros comuns para a aprendizagem por reforço
@@ -129,6 +222,10 @@ class AprendRef(ABC):
         self.alfa = alfa
         self.gama = gama
 
+        # Referências diretas aos metodos da memória, usados em cada passo da aprendizagem
+        self._Q = mem_aprend.Q
+        self._atualizar = mem_aprend.atualizar
+
     @abstractmethod
     def aprender(self, s, a, r, sn, an=None):
         """
@@ -146,23 +243,62 @@ class EGreedy(SelAcao):
     Classe da estratégia epsilon-greedy para a seleção de ações
     """
 
-    def __init__(self, mem_aprend, acoes, epsilon):
+    __slots__ = ('acoes', '_epsilon', '_n_acoes', 'decisoes')
+
+    def __init__(self, mem_aprend, acoes, epsilon, gerador=None):
         """
         Inicialização a estratégia epsilon-greedy
         """
 
-        super().__init__(mem_aprend)
-        self.acoes = acoes
+        super().__init__(mem_aprend, gerador)
+        # As ações são guardadas num tuplo; se forem as mesmas da memória (ex. MemoriaEsparsa) é usado o
+        # próprio tuplo da memória, para que esta as reconheça só pela identidade, sem comparar em cada passo
+        acoes = tuple(acoes)
+        acoes_memoria = getattr(mem_aprend, 'acoes', None)
+        self.acoes = acoes_memoria if acoes == acoes_memoria else acoes
         self.epsilon = epsilon
+        self._n_acoes = len(acoes)  # Número de ações, calculado uma vez para a exploração
+
+    @property
+    def epsilon(self):
+        """
+        Probabilidade de explorar em cada passo.
+        """
+
+        return self._epsilon
+
+    @epsilon.setter
+    def epsilon(self, epsilon):
+        """
+        Altera o epsilon e descarta as decisões já sorteadas com o valor anterior.
+        """
+
+        self._epsilon = epsilon
+        self.decisoes = iter(())  # Bloco de decisões (True = aproveitar, False = explorar) sorteadas de uma só vez
+
+    def novo_bloco_decisoes(self, dim=8192):
+        """
+        Sorteia um novo bloco de decisões entre aproveitar e explorar e retorna a primeira.
+
+        Como o epsilon é fixo durante o treino, as decisões de muitos passos podem ser sorteadas numa
+        só comparação NumPy e consumidas com next(). Quando o bloco se esgota é sorteado outro.
+        """
+
+        self.decisoes = iter((self.gerador.rng.random(dim) > self._epsilon).tolist())
+        return next(self.decisoes)
 
     def aproveitar(self, s):
         """
         Seleciona a melhor ação com base no maior valor Q.
 
         Este metodo implementa o aproveitamento, retornando a ação que maximiza
-        o valor Q para o seu estado atual
+        o valor Q para o seu estado atual. Se o Q-Learning acabou de calcular a melhor
+        ação para este estado (o próximo estado do passo anterior), essa ação é reutilizada.
         """
 
+        cache = self.melhor_acao_cache
+        if cache is not None and cache[0] == s:
+            return cache[1]
         return self.max_acao(s, self.acoes)
 
     def explorar(self):
@@ -173,7 +309,11 @@ class EGreedy(SelAcao):
         da lista de ações disponíveis.
         """
 
-        return choice(self.acoes)
+        gerador = self.gerador
+        u = next(gerador.uniformes, None)
+        if u is None:
+            u = gerador.novo_bloco()
+        return self.acoes[int(u * self._n_acoes)]
 
     def selecionar_acao(self, s):
         """
@@ -183,7 +323,10 @@ class EGreedy(SelAcao):
         de epsilon. Quanto maior o seu valor, maior a probabilidade de explorar.
         """
 
-        if random() > self.epsilon:
+        aproveitar = next(self.decisoes, None)
+        if aproveitar is None:
+            aproveitar = self.novo_bloco_decisoes()
+        if aproveitar:
             acao = self.aproveitar(s)  # Aproveitamento (escolhe a melhor ação).
         else:
             acao = self.explorar()  # Exploração (escolhe uma ação aleatória).
@@ -194,36 +337,122 @@ class MemoriaEsparsa(MemoriaAprend):
     """
     Implementação da classe memória esparsa
 
-    A memória esparsa guarda os valores Q associados a pares estado-ação
-    utilizando um dicionário.
+    A memória esparsa guarda os valores Q utilizando um dicionário, só para os estados já visitados.
+    Quando são indicadas as 'acoes', cada estado guarda um array float32 com os valores Q de todas
+    as ações, pela ordem de 'acoes', para que uma única consulta ao dicionário devolva os valores de
+    todas as ações do estado. Sem as 'acoes' o dicionário guarda um valor Q (float do Python) por
+    par (s, a), como nas versões anteriores.
     """
 
-    def __init__(self, valor_omissao=0.0):
+    __slots__ = ('acoes', 'acao_idx', 'valor_omissao', 'linha_omissao', 'memoria', '_get', 'maximos')
+
+    def __init__(self, acoes=None, valor_omissao=0.0):
         """
         Inicialização da memória esparsa.
         """
 
         self.valor_omissao = valor_omissao
-        self.memoria = {}
+        if acoes is None:
+            self.memoria = {}  # Dicionário (s, a) -> valor Q
+            self._get = self.memoria.get
+            self.acoes = self.acao_idx = self.linha_omissao = self.maximos = None
+            return
+
+        self.acoes = tuple(acoes)
+        self.acao_idx = {a: k for k, a in enumerate(acoes)}  # Ação -> posição no array do estado
+        self.linha_omissao = np.full(len(acoes), valor_omissao, dtype=np.float32)  # Valores dos estados não visitados
+        self.linha_omissao.flags.writeable = False
+        # O array de um estado é criado (cópia da linha_omissao) na primeira vez que o estado é atualizado;
+        # as consultas usam get, para não criar arrays para os estados que só são lidos
+        self.memoria = defaultdict(self.linha_omissao.copy)
+        self._get = self.memoria.get  # Referência direta ao get do dicionário, usado em cada consulta
+        # Estado -> (melhor ação, valor Q) quando a melhor ação é única, preenchido pelo SelAcao.max_acao_q
+        # e apagado sempre que o estado é atualizado. Os empates não são guardados, para que o sorteio
+        # entre as melhores ações continue a ser feito em cada escolha.
+        self.maximos = {}
 
     def Q(self, s, a):
         """
         Retorna o valor Q armazenado para um par (estado, ação).
 
-        Se o par (s, a) não estiver na memória, retorna o valor_omissao.
+        Se o estado s não estiver na memória, retorna o valor_omissao.
         Permitindo ao agente tratar pares não visitados como tendo valor Q zero
         ou outro valor padrão.
         """
 
-        return self.memoria.get((s, a), self.valor_omissao)
+        if self.acao_idx is None:
+            return self._get((s, a), self.valor_omissao)
+        return self._get(s, self.linha_omissao)[self.acao_idx[a]]
+
+    def Q_acoes(self, s, acoes):
+        """
+        Retorna os valores Q de várias ações para um estado dado.
+
+        Se as ações forem o próprio tuplo 'acoes' da memória (caso habitual, ver EGreedy), retorna
+        diretamente o array do estado.
+        """
+
+        if self.acao_idx is None:
+            return [self._get((s, a), self.valor_omissao) for a in acoes]
+        linha = self._get(s, self.linha_omissao)
+        if acoes is self.acoes:
+            return linha
+        return linha[[self.acao_idx[a] for a in acoes]]
 
     def atualizar(self, s, a, q):
         """
         Atualiza o valor Q para um par (estado, ação).
 
-        Insere o valor Q para o par (s, a) na memória.
+        Na primeira atualização de um estado é criado o seu array, com o valor_omissao nas restantes ações.
+        """
+        if self.acao_idx is None:
+            self.memoria[(s, a)] = q
+            return
+        self.maximos.pop(s, None)  # O máximo guardado para o estado deixa de ser válido
+        self.memoria[s][self.acao_idx[a]] = q
+
+
+class MemoriaDensa(MemoriaAprend):
+    """
+    Implementação da classe memória densa
+
+    A memória densa guarda os valores Q num array NumPy (estados x ações), com uma posição
+    para cada par estado-ação. Os estados e as ações são índices inteiros (0..n-1), por isso
+    é indicada para espaços de estados pequenos e conhecidos à partida (ex. o labirinto),
+    evitando o custo de calcular o hash dos pares (s, a) em cada acesso.
+    """
+
+    __slots__ = ('Q_table',)
+
+    def __init__(self, n_estados, n_acoes, valor_omissao=0.0):
+        """
+        Inicialização da memória densa.
+        """
+
+        self.Q_table = np.full((n_estados, n_acoes), valor_omissao, dtype=np.float32)
+
+    def Q(self, s, a):
+        """
+        Retorna o valor Q guardado para um par (estado, ação).
+        """
+
+        return self.Q_table[s, a]
+
+    def Q_acoes(self, s, acoes):
+        """
+        Retorna a linha da tabela Q com os valores de todas as ações do estado.
+
+        As ações têm de ser todos os índices 0..n_acoes-1, por ordem.
         """
-        self.memoria[(s, a)] = q
+
+        return self.Q_table[s]
+
+    def atualizar(self, s, a, q):
+        """
+        Atualiza o valor Q para um par (estado, ação).
+        """
+
+        self.Q_table[s, a] = q
 
 
 class SARSA(AprendRef):
@@ -234,18 +463,35 @@ class SARSA(AprendRef):
     considerando tanto o estado e ação atuais quanto o próximo estado e a próxima ação.
     """
 
+    __slots__ = ()
+
     def aprender(self, s, a, r, sn, an):
         """
         Atualiza os valores Q utilizando o algoritmo SARSA.
         """
 
-        qsa = self.mem_aprend.Q(s, a)  # Valor Q atual para o par (s, a)
+        qsa = self._Q(s, a)  # Valor Q atual para o par (s, a)
 
-        qsn_an = self.mem_aprend.Q(sn, an)  # Valor Q esperado para o próximo estado e próxima ação (SARSA)
+        qsn_an = self._Q(sn, an)  # Valor Q esperado para o próximo estado e próxima ação (SARSA)
 
         q = qsa + self.alfa * (r + self.gama * qsn_an - qsa)  # Atualiza o valor Q utilizando a fórmula do SARSA
 
-        self.mem_aprend.atualizar(s, a, q)  # Atualiza a memória com o novo valor Q
+        self._atualizar(s, a, q)  # Atualiza a memória com o novo valor Q
+
+    def aprender_lote(self, s, a, r, sn, an):
+        """
+        Atualiza os valores Q para um lote de transições usando o algoritmo SARSA.
+
+        Recebe arrays com os estados, ações, recompensas, próximos estados e próximas ações.
+        Com a memória densa o lote é atualizado por uma função compilada; com as outras memórias
+        as transições são aprendidas uma a uma.
+        """
+
+        if not isinstance(self.mem_aprend, MemoriaDensa):
+            for transicao in zip(s, a, r, sn, an):
+                SARSA.aprender(self, *transicao)
+        else:
+            atualizar_lote_sarsa(self.mem_aprend.Q_table, s, a, r, sn, an, self.alfa, self.gama)
 
 
 class QLearning(AprendRef):
@@ -257,20 +503,60 @@ class QLearning(AprendRef):
     estado, independentemente da política seguida atualmente.
     """
 
-    def aprender(self, s, a, r, sn):
+    __slots__ = ('_acoes', '_max_acao_q')
+
+    def __init__(self, mem_aprend, sel_accao, alfa, gama):
+        """
+        Inicializa os parametros do Q-Learning
+        """
+
+        super().__init__(mem_aprend, sel_accao, alfa, gama)
+
+        # Referências diretas às ações e ao max_acao_q da estratégia, usados em cada passo
+        self._acoes = sel_accao.acoes
+        self._max_acao_q = sel_accao.max_acao_q
+
+    def aprender(self, s, a, r, sn, an=None):
         """
         Atualiza os valores Q usando o algoritmo Q-Learning.
+
+        O 'an' é ignorado: o Q-Learning usa a melhor ação no próximo estado.
+        Retorna o erro de diferença temporal da transição.
         """
 
-        an = self.sel_accao.max_acao(sn, self.sel_accao.acoes)  # Seleciona a melhor ação no próximo estado (sn) utilizando o max_acao
+        # Seleciona a melhor ação no próximo estado (sn) e obtém o seu valor Q (Q-Learning usa a melhor ação)
+        an, qsn_an = self._max_acao_q(sn, self._acoes)
+
+        qsa = self._Q(s, a)  # Obtém o valor Q atual para o par (s, a)
+
+        td = r + self.gama * qsn_an - qsa  # Erro de diferença temporal
 
-        qsa = self.mem_aprend.Q(s, a)  # Obtém o valor Q atual para o par (s, a)
+        q = qsa + self.alfa * td  # Calcula o novo valor Q utilizando a fórmula do Q-Learning
 
-        qsn_an = self.mem_aprend.Q(sn, an)  # Obtém o valor Q para o próximo estado e a melhor ação (Q-Learning usa a melhor ação)
+        self._atualizar(s, a, q)  # Atualiza a memória com o novo valor Q
 
-        q = qsa + self.alfa * (r + self.gama * qsn_an - qsa)  # Calcula o novo valor Q utilizando a fórmula do Q-Learning
+        # Guarda a melhor ação de sn para o próximo passo (o aproveitar vai ser chamado com sn),
+        # exceto se o valor que acabou de ser alterado for do próprio sn (ex. bater numa parede)
+        self.sel_accao.melhor_acao_cache = (sn, an) if s != sn else None
 
-        self.mem_aprend.atualizar(s, a, q)  # Atualiza a memória com o novo valor Q
+        return td
+
+    def aprender_lote(self, s, a, r, sn):
+        """
+        Atualiza os valores Q para um lote de transições usando o algoritmo Q-Learning.
+
+        Recebe arrays com os estados, ações, recompensas e próximos estados. Com a memória densa
+        o lote é atualizado por uma função compilada, pela ordem das transições; com as outras
+        memórias as transições são aprendidas uma a uma.
+        Retorna um array com o erro de diferença temporal de cada transição.
+        """
+
+        if not isinstance(self.mem_aprend, MemoriaDensa):
+            td = np.array([QLearning.aprender(self, *transicao) for transicao in zip(s, a, r, sn)], dtype=np.float32)
+        else:
+            td = atualizar_lote_q_learning(self.mem_aprend.Q_table, s, a, r, sn, self.alfa, self.gama)
+        self.sel_accao.melhor_acao_cache = None  # O lote pode ter alterado qualquer estado
+        return td
 
 
 class DynaQ(QLearning):
@@ -282,16 +568,24 @@ class DynaQ(QLearning):
     aprender mais rapidamente explorando estados mesmo sem visitá-los diretamente.
     """
 
-    def __init__(self, mem_aprend, sel_accao, alfa, gama, num_sim):
+    __slots__ = ('num_sim', 'modelo')
+
+    def __init__(self, mem_aprend, sel_accao, alfa, gama, num_sim, n_estados=None, n_acoes=None):
         """
         Inicialização os parâmetros do Dyna-Q.
+
+        'n_estados' e 'n_acoes' definem a dimensão do modelo transitório, quando os estados e as ações
+        são índices inteiros; com a MemoriaDensa são obtidos da tabela Q. Sem eles, o modelo guarda
+        as transições em dicionários e aceita estados e ações de qualquer tipo.
         """
 
         super().__init__(mem_aprend, sel_accao, alfa, gama)  # Inicializa Q-Learning
         self.num_sim = num_sim  # Quantidade de simulações para acelerar a aprendizagem
-        self.modelo = ModeloTR()  # Modelo transitório para simulações
+        if n_estados is None and isinstance(mem_aprend, MemoriaDensa):
+            n_estados, n_acoes = mem_aprend.Q_table.shape
+        self.modelo = ModeloTR(n_estados, n_acoes, sel_accao.gerador)  # Modelo transitório para simulações
 
-    def aprender(self, s, a, r, sn):
+    def aprender(self, s, a, r, sn, an=None):
         """
         Atualiza os valores Q e o modelo transitório, e realiza simulações
         """
@@ -307,13 +601,15 @@ class DynaQ(QLearning):
         Realiza simulações baseadas no modelo transitório
 
         Durante as simulações, amostras de transições guardados no modelo transitório
-        são utilizadas para atualizar os valores Q, acelerando a aprendizagem
+        são utilizadas para atualizar os valores Q, acelerando a aprendizagem.
+        As amostras são tiradas e aprendidas de uma só vez, como no QME.
         """
 
-        for _ in range(self.num_sim):
-            s, a, r, sn = self.modelo.amostrar()  # Amostra de uma transição do modelo transitório
+        if self.modelo.n_visitados == 0 or self.num_sim == 0:
+            return  # Nada para simular
 
-            super().aprender(s, a, r, sn)  # Atualiza os valores Q com base na transição simulada.
+        amostras = self.modelo.amostrar_lote(self.num_sim)  # Amostras de transições do modelo transitório
+        self.aprender_lote(*amostras)  # Atualiza os valores Q com base nas transições simuladas
 
 
 class ModeloTR:
@@ -326,15 +622,36 @@ class ModeloTR:
 
     O modelo permite que o agente realize simulações, utilizando as transições armazenadas para
     atualizar os valores Q sem interagir diretamente com o ambiente.
+
+    Quando são indicados 'n_estados' e 'n_acoes' (estados e ações são índices inteiros), as transições
+    e as recompensas são guardadas em arrays NumPy (estados x ações), indexados diretamente pelo estado
+    e pela ação. Sem eles são usados dicionários com chaves (s, a), para estados e ações de qualquer tipo.
     """
 
-    def __init__(self):
+    __slots__ = ('T', 'R', 'visitados_S', 'visitados_A', 'pares', 'n_visitados', 'gerador')
+
+    def __init__(self, n_estados=None, n_acoes=None, gerador=None):
         """
         Inicialização do modelo de transições
         """
 
-        self.T = {}  # Dicionário para as transições: (s, a) -> sn
-        self.R = {}  # Dicionário para as recompensas: (s, a) -> r
+        self.gerador = gerador if gerador is not None else GeradorAleatorio()
+        self.n_visitados = 0
+
+        if n_estados is None:
+            self.T = {}  # Dicionário para as transições: (s, a) -> sn
+            self.R = {}  # Dicionário para as recompensas: (s, a) -> r
+            self.pares = []  # Pares (s, a) já observados, para a amostragem
+            self.visitados_S = self.visitados_A = None
+            return
+
+        self.pares = None
+        self.T = np.full((n_estados, n_acoes), -1, dtype=np.int32)  # Transições: [s, a] -> sn (-1 = par ainda não observado)
+        self.R = np.zeros((n_estados, n_acoes), dtype=np.float32)  # Recompensas: [s, a] -> r
+
+        # Pares (s, a) já observados, para a amostragem (um array para os estados e outro para as ações)
+        self.visitados_S = np.empty(n_estados * n_acoes, dtype=np.int32)
+        self.visitados_A = np.empty(n_estados * n_acoes, dtype=np.int32)
 
     def atualizar(self, s, a, r, sn):
         """
@@ -344,8 +661,21 @@ class ModeloTR:
         associados a um par estado-ação (s, a)
         """
 
-        self.T[(s, a)] = sn  # Atualiza o próximo estado para o par (s, a)
-        self.R[(s, a)] = r  # Atualiza a recompensa para o par (s, a)
+        if self.pares is not None:
+            if (s, a) not in self.T:
+                self.pares.append((s, a))
+                self.n_visitados += 1
+            self.T[(s, a)] = sn
+            self.R[(s, a)] = r
+            return
+
+        if self.T[s, a] == -1:
+            # Primeira vez que o par (s, a) é observado
+            self.visitados_S[self.n_visitados] = s
+            self.visitados_A[self.n_visitados] = a
+            self.n_visitados += 1
+        self.T[s, a] = sn  # Atualiza o próximo estado para o par (s, a)
+        self.R[s, a] = r  # Atualiza a recompensa para o par (s, a)
 
     def amostrar(self):
         """
@@ -355,14 +685,43 @@ class ModeloTR:
         permitindo ao agente aprender com experiências passadas
         """
 
-        s, a = choice(list(self.T.keys()))  # Seleciona aleatoriamente um par (estado, ação) guardado no dicionário T
+        if self.n_visitados == 0:
+            raise IndexError("O modelo ainda não tem transições para amostrar")
+
+        k = int(self.gerador.uniforme() * self.n_visitados)  # Seleciona aleatoriamente um par (estado, ação) já observado
+        if self.pares is not None:
+            s, a = self.pares[k]
+            return s, a, self.R[(s, a)], self.T[(s, a)]
+        s, a = int(self.visitados_S[k]), int(self.visitados_A[k])
 
-        # Seleciona aleatoriamente um par (estado, ação) guardado no dicionário T
-        sn = self.T[(s, a)]
-        r = self.R[(s, a)]
+        # Obtém o próximo estado e a recompensa guardados para o par (s, a)
+        sn = self.T[s, a]
+        r = self.R[s, a]
 
         return s, a, r, sn  # Retorna a transição simulada
 
+    def amostrar_lote(self, n):
+        """
+        Retorna n transições aleatórias armazenadas no modelo
+
+        Retorna um tuplo de arrays (estados, ações, recompensas, próximos estados), como o
+        MemoriaExperiencia.amostrar. Os pares são sorteados com repetição, como n chamadas ao
+        amostrar, por isso são sempre retornadas n transições, mesmo com poucos pares observados.
+        No modelo com dicionários são retornados tuplos em vez de arrays.
+        """
+
+        if self.n_visitados == 0:
+            raise IndexError("O modelo ainda não tem transições para amostrar")
+
+        idx = self.gerador.rng.integers(0, self.n_visitados, size=n)
+        if self.pares is not None:
+            pares = [self.pares[k] for k in idx.tolist()]
+            s, a = zip(*pares)
+            return s, a, tuple(self.R[p] for p in pares), tuple(self.T[p] for p in pares)
+        s = self.visitados_S[idx]
+        a = self.visitados_A[idx]
+        return s, a, self.R[s, a], self.T[s, a]
+
 
 class QME(QLearning):
     """
@@ -371,18 +730,32 @@ class QME(QLearning):
     O QME combina a aprendizagem do Q-Learning com o uso de uma memória de experiência.
     Ele guarda as transições observadas numa memória limitada, permitindo que o agente
     reutilize experiências passadas para melhorar a aprendizagem por meio de simulações.
+
+    Como a memória de experiência guarda as transições em arrays NumPy, os estados e as ações
+    têm de ser inteiros (ver MemoriaExperiencia).
     """
 
-    def __init__(self, mem_aprend, sel_accao, alfa, gama, num_sim, dim_max):
+    __slots__ = ('num_sim', 'memoria_experiencia')
+
+    def __init__(self, mem_aprend, sel_accao, alfa, gama, num_sim, dim_max, prioritaria=False, sem_repetidas=False):
         """
         Inicialização os parâmetros do QME.
+
+        Com 'prioritaria' as simulações usam uma MemoriaExperienciaPrioritaria, que repete mais
+        vezes as transições com maior erro de diferença temporal. Com 'sem_repetidas' a memória
+        de experiência guarda cada transição (s, a, sn) uma única vez.
         """
 
         super().__init__(mem_aprend, sel_accao, alfa, gama)  # Inicialização o Q-Learning padrão
         self.num_sim = num_sim  # Define quantas simulações serão realizadas por iteração
-        self.memoria_experiencia = MemoriaExperiencia(dim_max)  # Inicializa a memória de experiência
+        if prioritaria:
+            self.memoria_experiencia = MemoriaExperienciaPrioritaria(
+                dim_max, sem_repetidas=sem_repetidas, gerador=sel_accao.gerador)
+        else:
+            # Inicializa a memória de experiência
+            self.memoria_experiencia = MemoriaExperiencia(dim_max, sem_repetidas=sem_repetidas, gerador=sel_accao.gerador)
 
-    def aprender(self, s, a, r, sn):
+    def aprender(self, s, a, r, sn, an=None):
         """
         Atualiza os valores Q e guarda a transição na memória de experiência.
         """
@@ -403,11 +776,15 @@ class QME(QLearning):
         reforçar a aprendizagem sem interagir diretamente com o ambiente.
         """
 
+        if self.memoria_experiencia.n == 0 or self.num_sim == 0:
+            return  # Nada para simular
+
         amostras = self.memoria_experiencia.amostrar(self.num_sim)  # Obtém um conjunto de amostras da memória de experiência
 
-        # Para cada transição simulada, realiza a aprendizagem utilizando o Q-Learning
-        for s, a, r, sn in amostras:
-            super().aprender(s, a, r, sn)
+        # Realiza a aprendizagem de todas as transições simuladas de uma só vez, utilizando o Q-Learning
+        td = self.aprender_lote(*amostras)
+
+        self.memoria_experiencia.atualizar_prioridades(td)  # Só tem efeito na memória prioritária
 
 
 class MemoriaExperiencia:
@@ -417,38 +794,153 @@ class MemoriaExperiencia:
     A memória de experiência é utilizada para guardar transições observadas pelo agente.
     Essas transições podem ser reutilizadas para simulações, reforçando a aprendizagem
     sem depender de interações diretas com o ambiente.
+
+    Os estados e as ações têm de ser inteiros (ex. índices, como na MemoriaDensa), porque são
+    guardados em arrays NumPy; ao contrário da MemoriaEsparsa, não são aceites tuplos nem strings.
     """
 
-    def __init__(self, dim_max):
+    __slots__ = ('dim_max', 'S', 'A', 'R', 'Sn', 'n', 'pos', 'indice', 'gerador')
+
+    def __init__(self, dim_max, tipo_estado=np.int32, tipo_acao=np.int32, sem_repetidas=False, gerador=None):
         """
         Inicialização da memória de experiência com capacidade máxima
+
+        As transições são guardadas num buffer circular com um array NumPy para cada campo
+        (estados, ações, recompensas e próximos estados), em vez de uma lista de tuplos.
+        Por omissão os estados e as ações são índices inteiros, como na MemoriaDensa; 'tipo_estado'
+        e 'tipo_acao' permitem usar outro dtype (ex. np.int16 para poupar memória).
+
+        Com 'sem_repetidas' uma transição (s, a, sn) que já esteja na memória não ocupa uma nova
+        posição: é atualizada a recompensa da que já existe. Assim um ambiente que repete muitas
+        vezes as mesmas transições não enche a memória com cópias e as transições raras não se perdem.
         """
 
         self.dim_max = dim_max  # Define o tamanho máximo da memória
-        self.memoria = []  # Lista que guarda as transições
+        self.S = np.empty(dim_max, dtype=tipo_estado)  # Estados
+        self.A = np.empty(dim_max, dtype=tipo_acao)  # Ações
+        self.R = np.empty(dim_max, dtype=np.float32)  # Recompensas
+        self.Sn = np.empty(dim_max, dtype=tipo_estado)  # Próximos estados
+        self.n = 0  # Número de experiências guardadas
+        self.pos = 0  # Posição onde vai ser escrita a próxima experiência
+        self.indice = {} if sem_repetidas else None  # (s, a, sn) -> posição de cada transição guardada
+        self.gerador = gerador if gerador is not None else GeradorAleatorio()
 
     def atualizar(self, e):
         """
         Guarda uma nova experiência na memória e remove a mais antiga se a capacidade for excedida
 
         Este metodo é chamado sempre que uma nova transição (experiência) é observada.
-        Se a memória já estiver cheia, a transição mais antiga é removida antes
-        de adicionar a nova.
+        Se a memória já estiver cheia, a nova transição é escrita por cima da mais antiga.
+        Retorna a posição onde a transição foi guardada.
+        """
+
+        s, a, r, sn = e
+        if self.indice is not None:
+            chave = (s, a, sn)
+            pos = self.indice.get(chave)
+            if pos is not None:
+                self.R[pos] = r  # Transição repetida: só atualiza a recompensa
+                return pos
+            if self.n == self.dim_max:
+                # A transição mais antiga vai ser substituída, por isso deixa de estar no índice
+                del self.indice[(int(self.S[self.pos]), int(self.A[self.pos]), int(self.Sn[self.pos]))]
+            self.indice[chave] = self.pos
+
+        pos = self.pos
+        self.S[pos] = s
+        self.A[pos] = a
+        self.R[pos] = r
+        self.Sn[pos] = sn
+        self.pos = (pos + 1) % self.dim_max  # Avança a posição de escrita (volta ao início quando chega ao fim)
+        self.n = min(self.n + 1, self.dim_max)
+        return pos
+
+    def amostrar(self, n):
+        """
+        Retorna amostras aleatórias da memória
+
+        Este metodo seleciona aleatoriamente n transições diferentes guardadas na memória (sem
+        repetição, como o random.sample) e retorna um tuplo de arrays (estados, ações, recompensas,
+        próximos estados). Se o número de experiências guardadas for menor que n, retorna apenas
+        esse número de transições.
+        """
+
+        n_amostras = min(n, self.n)  # Garante que o número de amostras não excede o tamanho da memória
+        # Índices das transições selecionadas aleatoriamente, sem repetição
+        idx = self.gerador.rng.choice(self.n, size=n_amostras, replace=False)
+        return self.S[idx], self.A[idx], self.R[idx], self.Sn[idx]
+
+    def atualizar_prioridades(self, td):
+        """
+        Atualiza as prioridades das últimas transições amostradas com os seus erros de diferença temporal
+
+        A memória de experiência simples amostra todas as transições com a mesma probabilidade,
+        por isso este metodo não faz nada. É redefinido na MemoriaExperienciaPrioritaria.
+        """
+
+        pass
+
+
+class MemoriaExperienciaPrioritaria(MemoriaExperiencia):
+    """
+    Memória de experiência com amostragem prioritária
+
+    Cada transição tem uma prioridade (|erro de diferença temporal| elevado a 'expoente') e é amostrada
+    com probabilidade proporcional a essa prioridade, para que as simulações se concentrem nas
+    transições em que a tabela Q ainda está mais errada. As transições novas recebem a maior
+    prioridade já vista, para serem amostradas pelo menos uma vez.
+
+    As prioridades estão numa árvore de somas guardada num único array NumPy (por níveis: a raiz na
+    posição 1 e os filhos do nó i nas posições 2i e 2i+1), em que cada nó é a soma dos seus filhos
+    e as folhas são as prioridades das transições. Amostrar e atualizar custam O(log n) por transição
+    e são feitos por funções compiladas.
+    """
+
+    __slots__ = ('expoente', 'arvore', 'prioridade_max', 'ultimos_idx')
+
+    def __init__(self, dim_max, expoente=0.6, tipo_estado=np.int32, tipo_acao=np.int32, sem_repetidas=False,
+                 gerador=None):
+        """
+        Inicialização da memória de experiência prioritária com capacidade máxima
         """
 
-        # Remove a experiência mais antiga para libertar espaço
-        if len(self.memoria) == self.dim_max:
-            self.memoria.pop(0)
-        self.memoria.append(e)  # Adiciona a nova experiência no final da lista
+        super().__init__(dim_max, tipo_estado, tipo_acao, sem_repetidas, gerador)
+        self.expoente = expoente  # 0 = amostragem uniforme, 1 = proporcional ao erro
+        folhas = 1 << (dim_max - 1).bit_length()  # Número de folhas (potência de 2 >= dim_max)
+        self.arvore = np.zeros(2 * folhas, dtype=np.float64)  # Árvore de somas das prioridades
+        self.prioridade_max = 1.0  # Maior prioridade já vista, dada às transições novas
+        self.ultimos_idx = np.empty(0, dtype=np.int64)  # Índices das últimas transições amostradas
+
+    def atualizar(self, e):
+        """
+        Guarda uma nova experiência na memória com a maior prioridade já vista
+        """
+
+        pos = super().atualizar(e)
+        atualizar_arvore_somas(self.arvore, np.array([pos]), np.array([self.prioridade_max]))
+        return pos
 
     def amostrar(self, n):
         """
-        Retorna uma lista de amostras aleatórias da memória
+        Retorna amostras da memória, escolhidas com probabilidade proporcional à prioridade
+
+        O total das prioridades é dividido em n intervalos iguais e é sorteado um valor em cada um,
+        que desce a árvore até à folha da transição correspondente.
+        """
 
-        Este metodo seleciona aleatoriamente n transições guardadas na memória.
-        Se o número de experiências guardadas for menor que n, retorna todas as
-        transições disponíveis.
+        n_amostras = min(n, self.n)
+        u = (np.arange(n_amostras) + self.gerador.rng.random(n_amostras)) * (self.arvore[1] / max(n_amostras, 1))
+        idx = descer_arvore_somas(self.arvore, u)
+        self.ultimos_idx = idx
+        return self.S[idx], self.A[idx], self.R[idx], self.Sn[idx]
+
+    def atualizar_prioridades(self, td):
+        """
+        Atualiza as prioridades das últimas transições amostradas com os seus erros de diferença temporal
         """
 
-        n_amostras = min(n, len(self.memoria))  # Garante que o número de amostras não excede o tamanho da memória
-        return sample(self.memoria, n_amostras)  # Retorna uma lista de transições selecionadas aleatoriamente
\ No newline at end of file
+        if len(td) == 0:
+            return
+        prioridades = (np.abs(td.astype(np.float64)) + 1e-6) ** self.expoente  # O 1e-6 evita prioridades nulas
+        self.prioridade_max = max(self.prioridade_max, float(prioridades.max()))
+        atualizar_arvore_somas(self.arvore, self.ultimos_idx, prioridades)
\ No newline at end of file
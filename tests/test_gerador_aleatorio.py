@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from aprendizagem_reforco import DynaQ, EGreedy, GeradorAleatorio, MemoriaDensa, QLearning, QME
+
+# Labirinto em linha com 6 estados: a ação 1 avança e a ação 0 recua; o estado 5 é a saída
+N_ESTADOS = 6
+ACOES = [0, 1]
+
+
+def treinar(semente, criar_algoritmo, n_episodios=30):
+    """
+    Treina um agente com o GeradorAleatorio(semente) e retorna a tabela Q final
+    """
+    memoria = MemoriaDensa(N_ESTADOS, len(ACOES))
+    estrategia = EGreedy(memoria, ACOES, epsilon=0.3, gerador=GeradorAleatorio(semente))
+    algoritmo = criar_algoritmo(memoria, estrategia)
+    for _ in range(n_episodios):
+        s = 0
+        while s != N_ESTADOS - 1:
+            a = estrategia.selecionar_acao(s)
+            sn = min(s + 1, N_ESTADOS - 1) if a == 1 else max(s - 1, 0)
+            algoritmo.aprender(s, a, 1.0 if sn == N_ESTADOS - 1 else -1.0, sn)
+            s = sn
+    return memoria.Q_table
+
+
+ALGORITMOS = {
+    'QLearning': lambda m, e: QLearning(m, e, 0.1, 0.9),
+    'DynaQ': lambda m, e: DynaQ(m, e, 0.1, 0.9, 5),
+    'QME': lambda m, e: QME(m, e, 0.1, 0.9, 5, 50),
+    'QME prioritário': lambda m, e: QME(m, e, 0.1, 0.9, 5, 50, prioritaria=True),
+}
+
+
+class TestGeradorAleatorio(unittest.TestCase):
+
+    def test_mesma_semente_da_a_mesma_tabela_q(self):
+        for nome, criar_algoritmo in ALGORITMOS.items():
+            with self.subTest(nome):
+                np.testing.assert_array_equal(treinar(7, criar_algoritmo), treinar(7, criar_algoritmo))
+
+    def test_sementes_diferentes_dao_tabelas_diferentes(self):
+        criar_algoritmo = ALGORITMOS['QLearning']
+        self.assertFalse(np.array_equal(treinar(7, criar_algoritmo), treinar(8, criar_algoritmo)))
+
+
+if __name__ == '__main__':
+    unittest.main()
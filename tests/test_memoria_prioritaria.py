@@ -0,0 +1,102 @@
+import unittest
+
+import numpy as np
+
+from aprendizagem_reforco import GeradorAleatorio, MemoriaExperienciaPrioritaria
+from aprendizagem_reforco._nucleo import atualizar_arvore_somas, descer_arvore_somas
+
+
+def verificar_arvore(teste, arvore):
+    """
+    Verifica que cada nó interno da árvore de somas é a soma dos seus dois filhos
+    """
+    folhas = arvore.shape[0] // 2
+    for k in range(1, folhas):
+        teste.assertAlmostEqual(arvore[k], arvore[2 * k] + arvore[2 * k + 1])
+
+
+class TestArvoreSomas(unittest.TestCase):
+
+    def test_raiz_e_a_soma_das_prioridades(self):
+        arvore = np.zeros(16)
+        prioridades = np.array([0.5, 0.0, 2.0, 1.5, 0.0, 3.0, 0.25, 0.0])
+        atualizar_arvore_somas(arvore, np.arange(8), prioridades)
+        self.assertAlmostEqual(arvore[1], prioridades.sum())
+        verificar_arvore(self, arvore)
+
+        atualizar_arvore_somas(arvore, np.array([2, 5]), np.array([1.0, 0.0]))
+        prioridades[[2, 5]] = [1.0, 0.0]
+        self.assertAlmostEqual(arvore[1], prioridades.sum())
+        verificar_arvore(self, arvore)
+
+    def test_descida_nunca_chega_a_folhas_nulas(self):
+        arvore = np.zeros(16)
+        prioridades = np.array([1.0, 0.0, 2.0, 0.0, 0.0, 3.0, 0.0, 0.0])
+        atualizar_arvore_somas(arvore, np.arange(8), prioridades)
+
+        # Inclui valores nas fronteiras entre folhas e iguais (ou superiores, por arredondamento) ao total
+        u = np.concatenate([np.linspace(0.0, arvore[1], 1001), [np.nextafter(arvore[1], np.inf)]])
+        folhas = descer_arvore_somas(arvore, u)
+        self.assertTrue(np.all(prioridades[folhas] > 0))
+
+
+class TestMemoriaExperienciaPrioritaria(unittest.TestCase):
+
+    def criar_memoria(self, dim_max, n, expoente=1.0):
+        """
+        Cria uma memória com 'n' transições, em que o estado de cada uma é a posição onde foi guardada
+        """
+        memoria = MemoriaExperienciaPrioritaria(dim_max, expoente=expoente, gerador=GeradorAleatorio(0))
+        for s in range(n):
+            memoria.atualizar((s, 0, -1.0, s + 1))
+        return memoria
+
+    def test_transicoes_novas_tem_a_prioridade_maxima(self):
+        memoria = self.criar_memoria(5, 3)
+        folhas = memoria.arvore.shape[0] // 2
+        np.testing.assert_array_equal(memoria.arvore[folhas:folhas + 5], [1.0, 1.0, 1.0, 0.0, 0.0])
+        self.assertAlmostEqual(memoria.arvore[1], 3.0)
+        verificar_arvore(self, memoria.arvore)
+
+    def test_amostragem_proporcional_a_prioridade(self):
+        memoria = self.criar_memoria(6, 5)  # 8 folhas, das quais 3 vazias
+        memoria.ultimos_idx = np.arange(5)
+        memoria.atualizar_prioridades(np.array([1.0, 2.0, 3.0, 4.0, 10.0], dtype=np.float32))
+        prioridades = np.array([1.0, 2.0, 3.0, 4.0, 10.0]) + 1e-6
+
+        contagens = np.zeros(8, dtype=np.int64)
+        for _ in range(20000):
+            estados = memoria.amostrar(5)[0]
+            np.add.at(contagens, estados, 1)
+
+        self.assertEqual(contagens[5:].sum(), 0)  # As posições vazias nunca são amostradas
+        frequencias = contagens[:5] / contagens.sum()
+        np.testing.assert_allclose(frequencias, prioridades / prioridades.sum(), rtol=0.03)
+
+    def test_atualizar_prioridades_depois_de_dar_a_volta(self):
+        memoria = self.criar_memoria(4, 4)
+        folhas = memoria.arvore.shape[0] // 2
+        memoria.ultimos_idx = np.arange(4)
+        memoria.atualizar_prioridades(np.array([1.0, 2.0, 3.0, 4.0], dtype=np.float32))
+
+        # As duas transições seguintes substituem as das posições 0 e 1, com a maior prioridade já vista
+        memoria.atualizar((10, 0, -1.0, 11))
+        memoria.atualizar((11, 0, -1.0, 12))
+        self.assertEqual(memoria.n, 4)
+        np.testing.assert_array_equal(memoria.S, [10, 11, 2, 3])
+        np.testing.assert_allclose(memoria.arvore[folhas:folhas + 4], [4.0, 4.0, 3.0, 4.0], rtol=1e-5)
+
+        # As prioridades das transições amostradas vão para as suas posições no buffer circular
+        estados = memoria.amostrar(4)[0]
+        np.testing.assert_array_equal(memoria.S[memoria.ultimos_idx], estados)
+        td = np.array([0.5, 0.25, 2.0, 1.0], dtype=np.float32)
+        memoria.atualizar_prioridades(td)
+        esperado = np.array([4.0, 4.0, 3.0, 4.0]) + 1e-6
+        esperado[memoria.ultimos_idx] = np.abs(td) + 1e-6
+        np.testing.assert_allclose(memoria.arvore[folhas:folhas + 4], esperado, rtol=1e-5)
+        self.assertAlmostEqual(memoria.arvore[1], esperado.sum(), places=5)
+        verificar_arvore(self, memoria.arvore)
+
+
+if __name__ == '__main__':
+    unittest.main()